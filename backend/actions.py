@@ -0,0 +1,76 @@
+from datetime import date
+
+# Shared by main.py and streamlit_app.py so both apps write identical action_items rows
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS action_items
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        meeting_id INTEGER REFERENCES meetings(id),
+        owner TEXT,
+        task TEXT,
+        due_date TEXT,
+        due_phrase TEXT,
+        source_turn TEXT)''',
+    # /action-items filters by owner and due date, so both must be index lookups
+    "CREATE INDEX IF NOT EXISTS idx_action_items_owner_due ON action_items (owner COLLATE NOCASE, due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_action_items_due ON action_items (due_date)",
+]
+
+COLUMNS = ("owner", "task", "due_date", "due_phrase", "source_turn")
+
+
+def init_table(c):
+    for statement in SCHEMA:
+        c.execute(statement)
+    # Databases created before due_phrase existed
+    existing = {row[1] for row in c.execute("PRAGMA table_info(action_items)")}
+    if "due_phrase" not in existing:
+        c.execute("ALTER TABLE action_items ADD COLUMN due_phrase TEXT")
+
+
+def as_text(value):
+    """Coerces one model-supplied field to a string or None.
+
+    Lists (e.g. several owners) are joined with ", " and other scalars are
+    str()'d, so an odd type never costs us the whole generation.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(str(part) for part in value if part is not None)
+    return str(value).strip() or None
+
+
+def parse(raw_items):
+    """Coerces the model's action items into row dicts, dropping ones without a task.
+
+    Only ISO due dates are kept so /action-items can compare them as strings;
+    the deadline as spoken ("Friday", "before the DNS switch") stays in due_phrase.
+    """
+    items = []
+    for raw in raw_items or []:
+        if not isinstance(raw, dict) or not isinstance(raw.get("task"), str) or not raw["task"].strip():
+            continue
+        try:
+            due_date = date.fromisoformat(as_text(raw.get("due_date"))).isoformat()
+        except (TypeError, ValueError):
+            due_date = None
+        items.append({
+            "owner": as_text(raw.get("owner")),
+            "task": raw["task"].replace("**", "").replace("__", "").replace("`", "").strip(),
+            "due_date": due_date,
+            "due_phrase": as_text(raw.get("due_phrase")),
+            "source_turn": as_text(raw.get("source_turn")),
+        })
+    return items
+
+
+def insert(c, meeting_id, items):
+    c.executemany(
+        f"INSERT INTO action_items (meeting_id, {', '.join(COLUMNS)}) VALUES (?, {', '.join('?' for _ in COLUMNS)})",
+        [(meeting_id, *(item[column] for column in COLUMNS)) for item in items]
+    )
+
+
+def load(c, meeting_id):
+    c.execute(f"SELECT {', '.join(COLUMNS)} FROM action_items WHERE meeting_id = ? ORDER BY id", (meeting_id,))
+    return [dict(zip(COLUMNS, row)) for row in c.fetchall()]
@@ -1,17 +1,43 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import uvicorn
 import os
-from typing import List
-import docx
-import google.generativeai as genai
+from typing import List, Optional
+import prompts
+import actions
 from dotenv import load_dotenv
 import json
+import asyncio
+import hashlib
+import time
+import importlib
+from contextlib import asynccontextmanager
+
+# google.generativeai, docx and uvicorn are not imported at module level:
+# the Gemini SDK alone accounts for over half of this module's import time.
+# The SDKs are warmed in a worker thread after startup, see lifespan().
+LAZY_MODULES = ["google.generativeai", "docx"]
 
 load_dotenv()
 
-app = FastAPI()
+async def import_off_loop(name):
+    """Imports a lazy SDK in a worker thread so the event loop keeps serving.
+
+    If the startup warm-up is still importing it, the thread waits on the
+    import lock instead of the event loop.
+    """
+    return await asyncio.to_thread(importlib.import_module, name)
+
+@asynccontextmanager
+async def lifespan(app):
+    # One-time startup work, run once per worker instead of on import
+    init_db()
+    # Warm the SDKs after the worker is ready so the first /generate does not pay for them
+    warmup = asyncio.gather(*[import_off_loop(name) for name in LAZY_MODULES], return_exceptions=True)
+    yield
+    await warmup
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS setup
 origins = [
@@ -29,7 +55,7 @@ app.add_middleware(
 )
 
 import sqlite3
-from datetime import datetime
+from datetime import datetime, date
 
 # Database setup
 def init_db():
@@ -42,11 +68,16 @@ def init_db():
                   summary TEXT,
                   emails TEXT,
                   timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    # One row per in-flight generation, shared by every worker process
+    c.execute('''CREATE TABLE IF NOT EXISTS generation_locks
+                 (request_key TEXT PRIMARY KEY,
+                  acquired_at REAL,
+                  completed_at REAL,
+                  meeting_id INTEGER)''')
+    actions.init_table(c)
     conn.commit()
     conn.close()
 
-init_db()
-
 class HistoryItem(BaseModel):
     id: int
     filename: str
@@ -55,6 +86,17 @@ class HistoryItem(BaseModel):
     emails: List[str]
     timestamp: str
 
+class ActionItem(BaseModel):
+    owner: Optional[str] = None
+    task: str
+    due_date: Optional[str] = None
+    due_phrase: Optional[str] = None
+    source_turn: Optional[str] = None
+
+class ActionItemRecord(ActionItem):
+    id: int
+    meeting_id: int
+
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
@@ -85,6 +127,33 @@ def get_history():
         ))
     return history
 
+@app.get("/action-items", response_model=List[ActionItemRecord])
+def get_action_items(owner: Optional[str] = None, due_before: Optional[date] = None):
+    query = f"SELECT id, meeting_id, {', '.join(actions.COLUMNS)} FROM action_items"
+    conditions = []
+    params = []
+    if owner:
+        conditions.append("owner = ? COLLATE NOCASE")
+        params.append(owner)
+    if due_before:
+        conditions.append("due_date < ?")
+        params.append(due_before.isoformat())
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY due_date IS NULL, due_date, id"
+    
+    conn = sqlite3.connect('meetings.db')
+    c = conn.cursor()
+    c.execute(query, params)
+    rows = c.fetchall()
+    conn.close()
+    
+    return [ActionItemRecord(
+        id=row[0],
+        meeting_id=row[1],
+        **dict(zip(actions.COLUMNS, row[2:]))
+    ) for row in rows]
+
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
     filename = file.filename
@@ -94,6 +163,8 @@ async def upload_file(file: UploadFile = File(...)):
         if filename.endswith(".txt"):
             content = (await file.read()).decode("utf-8")
         elif filename.endswith(".docx"):
+            docx = await import_off_loop("docx")
+            
             # Save temporarily to read with python-docx
             temp_filename = f"temp_{filename}"
             with open(temp_filename, "wb") as f:
@@ -114,10 +185,99 @@ async def upload_file(file: UploadFile = File(...)):
 class GenerateResponse(BaseModel):
     summary: str
     emails: List[str]
+    action_items: List[ActionItem] = []
 
 class GenerateRequest(BaseModel):
     transcript: str
     filename: str = "Unknown File"
+    # Relative deadlines ("Friday") are resolved against this; defaults to today
+    meeting_date: Optional[date] = None
+
+# --- Single-flight generation ---
+# A lock older than this is assumed to belong to a crashed worker
+LOCK_TIMEOUT = 120
+# How long a finished lock keeps handing its result to late joiners
+LOCK_GRACE = 5
+LOCK_POLL_INTERVAL = 0.2
+
+# request key -> task running the one Gemini call for it in this process
+_inflight = {}
+
+def normalize_transcript(transcript):
+    """Strips per-line whitespace and blank lines so trivially different pastes match."""
+    lines = [line.strip() for line in transcript.strip().splitlines()]
+    return "\n".join(line for line in lines if line)
+
+def request_key(transcript, meeting_date):
+    prompt = prompts.get_prompt("meeting_summary")
+    payload = "\0".join([prompt.key, prompt.system_instruction, meeting_date.isoformat(),
+                         normalize_transcript(transcript)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def acquire_generation_lock(key):
+    """Returns True if this worker now owns the generation for `key`."""
+    now = time.time()
+    conn = sqlite3.connect('meetings.db')
+    try:
+        c = conn.cursor()
+        # Clears expired rows for every key, so finished locks do not pile up
+        c.execute("""DELETE FROM generation_locks
+                     WHERE acquired_at < ? OR (completed_at IS NOT NULL AND completed_at < ?)""",
+                  (now - LOCK_TIMEOUT, now - LOCK_GRACE))
+        c.execute("INSERT OR IGNORE INTO generation_locks (request_key, acquired_at) VALUES (?, ?)",
+                  (key, now))
+        conn.commit()
+        return c.rowcount == 1
+    finally:
+        conn.close()
+
+def release_generation_lock(key):
+    conn = sqlite3.connect('meetings.db')
+    try:
+        conn.execute("DELETE FROM generation_locks WHERE request_key = ? AND meeting_id IS NULL", (key,))
+        conn.commit()
+    finally:
+        conn.close()
+
+async def wait_for_generation(key):
+    """Polls the lock held by another worker until it publishes a meeting.
+
+    Returns None if the lock went away without a result (owner failed or
+    went stale), in which case the caller should try to take it over.
+    """
+    while True:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        conn = sqlite3.connect('meetings.db')
+        try:
+            c = conn.cursor()
+            c.execute("SELECT acquired_at, meeting_id FROM generation_locks WHERE request_key = ?", (key,))
+            lock = c.fetchone()
+            if lock is None or lock[0] < time.time() - LOCK_TIMEOUT:
+                return None
+            if lock[1] is None:
+                continue
+            c.execute("SELECT summary, emails FROM meetings WHERE id = ?", (lock[1],))
+            row = c.fetchone()
+            items = actions.load(c, lock[1])
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return GenerateResponse(summary=row[0], emails=json.loads(row[1]), action_items=items)
+
+def save_meeting(request, data, action_items, key):
+    conn = sqlite3.connect('meetings.db')
+    try:
+        c = conn.cursor()
+        c.execute("INSERT INTO meetings (filename, transcript, summary, emails) VALUES (?, ?, ?, ?)",
+                  (request.filename, request.transcript, data["summary"], json.dumps(data["emails"])))
+        meeting_id = c.lastrowid
+        actions.insert(c, meeting_id, action_items)
+        c.execute("UPDATE generation_locks SET meeting_id = ?, completed_at = ? WHERE request_key = ?",
+                  (meeting_id, time.time(), key))
+        conn.commit()
+    finally:
+        conn.close()
 
 @app.post("/generate", response_model=GenerateResponse)
 async def generate_content(request: GenerateRequest):
@@ -126,32 +286,41 @@ async def generate_content(request: GenerateRequest):
         print("DEBUG: No API Key found in env")
         raise HTTPException(status_code=500, detail="API Key not found. Please set GEMINI_API_KEY in .env file.")
     
+    if request.meeting_date is None:
+        request.meeting_date = date.today()
+    key = request_key(request.transcript, request.meeting_date)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(generate_single_flight(request, key, api_key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one client disconnecting does not cancel the shared call
+    return await asyncio.shield(task)
+
+async def generate_single_flight(request, key, api_key):
+    while not acquire_generation_lock(key):
+        shared = await wait_for_generation(key)
+        if shared is not None:
+            return shared
+    
+    try:
+        return await generate_with_gemini(request, key, api_key)
+    finally:
+        release_generation_lock(key)
+
+async def generate_with_gemini(request, key, api_key):
     print(f"DEBUG: Using API Key starting with: {api_key[:5]}")
+    genai = await import_off_loop("google.generativeai")
     genai.configure(api_key=api_key)
     
-    # Using gemini-flash-latest as it is explicitly listed
-    model = genai.GenerativeModel('gemini-flash-latest')
-    
-    prompt = f"""
-    You are an expert meeting assistant. Analyze the following meeting transcript and provide:
-    1. A summary of the meeting (100-150 words).
-    2. Three distinct follow-up email drafts:
-       - Option 1: Formal and detailed.
-       - Option 2: Concise and action-oriented.
-       - Option 3: Friendly and casual.
-    
-    Return the output strictly in VALID JSON format with the following structure. Do not include any markdown formatting like ```json ... ```, just the raw JSON string:
-    {{
-        "summary": "...",
-        "emails": ["Email 1 content...", "Email 2 content...", "Email 3 content..."]
-    }}
-    
-    Transcript:
-    {request.transcript[:10000]} 
-    """
+    prompt = prompts.get_prompt("meeting_summary")
     
     try:
-        response = model.generate_content(prompt)
+        # Building the model may hit the network (token count, cache create)
+        model = await asyncio.to_thread(prompts.get_model, prompt, api_key)
+        started = time.perf_counter()
+        response = await model.generate_content_async(prompt.render(request.transcript, request.meeting_date))
+        prompts.record_usage(prompt, response, started)
         content = response.text
         
         # Clean up markdown code blocks if present
@@ -165,19 +334,15 @@ async def generate_content(request: GenerateRequest):
         content = content.strip()
         
         data = json.loads(content)
+        action_items = actions.parse(data.get("action_items"))
         
         # Save to DB
         try:
-            conn = sqlite3.connect('meetings.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO meetings (filename, transcript, summary, emails) VALUES (?, ?, ?, ?)",
-                      (request.filename, request.transcript, data["summary"], json.dumps(data["emails"])))
-            conn.commit()
-            conn.close()
+            save_meeting(request, data, action_items, key)
         except Exception as db_err:
             print(f"Database Error: {db_err}")
         
-        return GenerateResponse(summary=data["summary"], emails=data["emails"])
+        return GenerateResponse(summary=data["summary"], emails=data["emails"], action_items=action_items)
         
     except Exception as e:
         print(f"Error generating content: {e}")
@@ -197,4 +362,5 @@ async def generate_content(request: GenerateRequest):
         return GenerateResponse(summary=demo_summary, emails=demo_emails)
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,188 @@
+import threading
+import time
+from datetime import timedelta
+from string import Template
+
+# Shared by main.py and streamlit_app.py so both apps send identical prompts
+MODEL_NAME = 'gemini-flash-latest'
+CACHE_TTL = timedelta(hours=1)
+# Gemini rejects cached content smaller than this many tokens
+MIN_CACHE_TOKENS = 1024
+# Prose averages ~4 characters per token; below 2 per token the instructions
+# are certainly too small to cache, so no count_tokens call is needed
+MIN_CHARS_PER_TOKEN = 2
+MAX_TRANSCRIPT_CHARS = 10000
+
+
+class Prompt:
+    """A versioned prompt: static system instructions plus a per-request template.
+
+    The template is compiled once at import, and only its rendered output
+    (the transcript) is sent with each request.
+    """
+
+    def __init__(self, name, version, system_instruction, template):
+        self.name = name
+        self.version = version
+        self.system_instruction = system_instruction.strip()
+        self.template = Template(template)
+
+    @property
+    def key(self):
+        return f"{self.name}@v{self.version}"
+
+    def render(self, transcript, meeting_date):
+        return self.template.substitute(
+            meeting_date=meeting_date.isoformat(),
+            transcript=transcript[:MAX_TRANSCRIPT_CHARS]
+        )
+
+
+MEETING_SUMMARY_V2 = Prompt("meeting_summary", 2, """
+You are an expert meeting assistant. Analyze the meeting transcript you are given and provide:
+1. A summary of the meeting (100-150 words).
+2. Three distinct follow-up email drafts:
+   - Option 1: Formal and detailed.
+   - Option 2: Concise and action-oriented.
+   - Option 3: Friendly and casual.
+3. Every action item agreed in the meeting, with its owner (person's name, or null), the task,
+   the deadline exactly as it was said (due_phrase, or null if none was given), that deadline as a
+   YYYY-MM-DD due_date, and the transcript line it came from, quoted verbatim.
+   Resolve relative deadlines such as "Friday" or "next week" against the meeting date given with
+   the transcript. If a deadline cannot be pinned to a calendar day ("before the DNS switch"), set
+   due_date to null and keep only the due_phrase.
+
+Return the output strictly in VALID JSON format with the following structure. Do not include any markdown formatting like ```json ... ```, just the raw JSON string:
+{
+    "summary": "...",
+    "emails": ["Email 1 content...", "Email 2 content...", "Email 3 content..."],
+    "action_items": [{"owner": "...", "task": "...", "due_phrase": "...", "due_date": "YYYY-MM-DD", "source_turn": "..."}]
+}
+""", "Meeting date: $meeting_date\n\nTranscript:\n$transcript")
+
+# These instructions come to a few hundred tokens, well under MIN_CACHE_TOKENS,
+# so context caching does NOT apply at the current prompt size: get_model() skips
+# count_tokens and CachedContent.create, and the instructions are sent (and billed) with every
+# request as system_instruction. Caching turns on by itself if they outgrow the minimum.
+
+# name -> {version: Prompt}
+PROMPTS = {
+    "meeting_summary": {2: MEETING_SUMMARY_V2},
+}
+
+
+def get_prompt(name, version=None):
+    """Returns the requested version of a prompt, or its latest one."""
+    versions = PROMPTS[name]
+    return versions[version if version is not None else max(versions)]
+
+
+# (api key, prompt key) -> (model, expires_at)
+_models = {}
+# prompt key -> token count of its system instructions (None if it could not be counted)
+_instruction_tokens = {}
+# prompt key -> (calls, total ms) for calls that got no cache hit, the latency baseline
+_uncached_latency = {}
+# get_model runs in worker threads; this keeps concurrent misses from each
+# counting tokens and creating their own (separately billed) cache
+_models_lock = threading.Lock()
+
+
+def count_instruction_tokens(prompt):
+    """Counts the prompt's system instructions once per process.
+
+    Returns None without a network call when the instructions are too short
+    to ever reach MIN_CACHE_TOKENS. Callers must hold _models_lock.
+    """
+    if len(prompt.system_instruction) < MIN_CACHE_TOKENS * MIN_CHARS_PER_TOKEN:
+        return None
+    if prompt.key not in _instruction_tokens:
+        import google.generativeai as genai
+
+        try:
+            count = genai.GenerativeModel(MODEL_NAME).count_tokens(prompt.system_instruction)
+            _instruction_tokens[prompt.key] = count.total_tokens
+        except Exception as e:
+            print(f"DEBUG: Could not count tokens for {prompt.key}: {e}")
+            _instruction_tokens[prompt.key] = None
+    return _instruction_tokens[prompt.key]
+
+
+def get_model(prompt, api_key):
+    """Returns a model bound to the prompt's system instructions.
+
+    When the instructions reach MIN_CACHE_TOKENS they are put in a Gemini
+    cached-content handle, so they are processed once per TTL and only the
+    transcript is billed per request. Below that size (the case for every
+    prompt registered today) the create call is skipped and the model uses a
+    plain system_instruction, which is re-sent with each request.
+
+    This makes blocking network calls; async callers should run it in a thread.
+    """
+    cached = _models.get((api_key, prompt.key))
+    if cached and cached[1] > time.time():
+        return cached[0]
+
+    with _models_lock:
+        # Another thread may have built it while we waited
+        cached = _models.get((api_key, prompt.key))
+        if cached and cached[1] > time.time():
+            return cached[0]
+        return _build_model(prompt, api_key)
+
+
+def _build_model(prompt, api_key):
+    import google.generativeai as genai
+    from google.generativeai import caching
+
+    model = None
+    instruction_tokens = count_instruction_tokens(prompt)
+    if instruction_tokens is not None and instruction_tokens >= MIN_CACHE_TOKENS:
+        try:
+            cache = caching.CachedContent.create(
+                model=MODEL_NAME,
+                display_name=prompt.key,
+                system_instruction=prompt.system_instruction,
+                ttl=CACHE_TTL
+            )
+            model = genai.GenerativeModel.from_cached_content(cached_content=cache)
+        except Exception as e:
+            print(f"DEBUG: Context caching failed for {prompt.key}, using system_instruction: {e}")
+    if model is None:
+        model = genai.GenerativeModel(MODEL_NAME, system_instruction=prompt.system_instruction)
+
+    # Refresh a minute early so a handle is never used right as its cache expires
+    _models[(api_key, prompt.key)] = (model, time.time() + CACHE_TTL.total_seconds() - 60)
+    return model
+
+
+def record_usage(prompt, response, started):
+    """Logs one call's input tokens and latency against their uncached baselines.
+
+    The token baseline is the full prompt (instructions plus transcript), i.e.
+    what is billed without a cache hit; the latency baseline is the mean of
+    this process's earlier calls that got no cache hit.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    input_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    calls, total_ms = _uncached_latency.get(prompt.key, (0, 0.0))
+    baseline_ms = total_ms / calls if calls else None
+    if not cached_tokens:
+        _uncached_latency[prompt.key] = (calls + 1, total_ms + latency_ms)
+
+    metrics = {
+        "prompt": prompt.key,
+        "instruction_tokens": _instruction_tokens.get(prompt.key),
+        "input_tokens": input_tokens,
+        "billed_input_tokens": input_tokens - cached_tokens,
+        "input_tokens_saved": cached_tokens,
+        "input_token_reduction_pct": round(100 * cached_tokens / input_tokens, 1) if input_tokens else 0.0,
+        "latency_ms": round(latency_ms, 1),
+        "uncached_latency_ms": round(baseline_ms, 1) if baseline_ms is not None else None,
+        "latency_delta_ms": round(latency_ms - baseline_ms, 1) if baseline_ms is not None else None,
+    }
+    print("METRICS: " + " ".join(f"{k}={v}" for k, v in metrics.items()))
+    return metrics
@@ -1,13 +1,17 @@
 import streamlit as st
-import google.generativeai as genai
 import sqlite3
 import json
 import os
 from dotenv import load_dotenv
-import docx
 from datetime import datetime
 import streamlit.components.v1 as components
 import urllib.parse
+import time
+import prompts
+import actions
+
+# google.generativeai and docx are imported where they are first used so a
+# cold start only pays for them once a transcript is actually processed.
 
 # Load environment variables
 load_dotenv()
@@ -21,110 +25,13 @@ st.set_page_config(
 )
 
 # --- Custom CSS to mimic React UI ---
-st.markdown("""
-<style>
-    /* Main Background */
-    .stApp {
-        background-color: #f8fafc;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Sidebar */
-    section[data-testid="stSidebar"] {
-        background-color: white;
-        border-right: 1px solid #e5e7eb;
-    }
-    
-    /* Sidebar Nav Buttons */
-    div[data-testid="stSidebar"] button {
-        background-color: transparent;
-        color: #6b7280;
-        border: none;
-        text-align: left;
-        font-weight: 500;
-        padding: 0.75rem 1rem;
-        transition: all 0.2s;
-    }
-    div[data-testid="stSidebar"] button:hover {
-        background-color: #f1f5f9;
-        color: #111827;
-    }
-    
-    /* Primary Button (Blue) */
-    div.stButton > button[kind="primary"] {
-        background-color: #2563eb;
-        color: white;
-        border-radius: 12px;
-        border: none;
-        padding: 0.5rem 1rem;
-        font-weight: 600;
-        box-shadow: 0 4px 6px -1px rgba(37, 99, 235, 0.2);
-    }
-    div.stButton > button[kind="primary"]:hover {
-        background-color: #1d4ed8;
-        border-color: #1d4ed8;
-    }
-    
-    /* Secondary Button (White) */
-    div.stButton > button[kind="secondary"] {
-        background-color: white;
-        color: #111827;
-        border: 1px solid #e5e7eb;
-        border-radius: 8px;
-    }
-    
-    /* Cards/Containers */
-    div[data-testid="stExpander"], div.stTextArea, div.stTextInput {
-        background-color: white;
-        border-radius: 12px;
-        border: 1px solid #e5e7eb;
-    }
-    
-    /* Headers */
-    h1, h2, h3 {
-        color: #111827;
-        font-weight: 700;
-    }
-    
-    /* Remove standard Streamlit header decoration */
-    header {visibility: hidden;}
-    
-    /* Custom Avatar Circle */
-    .avatar-circle {
-        width: 32px;
-        height: 32px;
-        background-color: #2563eb;
-        color: white;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-weight: 600;
-        font-size: 14px;
-    }
-    
-    /* Improve File Uploader UI */
-    [data-testid="stFileUploader"] {
-        border: 2px dashed #cbd5e1;
-        border-radius: 12px;
-        padding: 2rem;
-        text-align: center;
-        background-color: #f8fafc;
-        transition: border-color 0.3s;
-    }
-    [data-testid="stFileUploader"]:hover {
-        border-color: #2563eb;
-        background-color: #f1f5f9;
-    }
-    section[data-testid="stFileUploader"] > div > div > button {
-        background-color: #2563eb;
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 0.5rem 1rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def load_css():
+    # Read once per process; the <style> tag itself has to be re-emitted on every rerun
+    with open(os.path.join(os.path.dirname(__file__), "styles.css")) as f:
+        return f"<style>\n{f.read()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # --- Helper Functions ---
 def clean_text(text):
@@ -134,10 +41,11 @@ def clean_text(text):
 
 def copy_to_clipboard(text):
     # JavaScript hack to copy text to clipboard
+    escaped = text.replace('`', '\\`')
     components.html(
         f"""
         <script>
-        navigator.clipboard.writeText(`{text.replace('`', '\`')}`);
+        navigator.clipboard.writeText(`{escaped}`);
         </script>
         """,
         height=0,
@@ -147,11 +55,12 @@ def read_file(uploaded_file):
     if uploaded_file.name.endswith(".txt"):
         return uploaded_file.read().decode("utf-8")
     elif uploaded_file.name.endswith(".docx"):
+        import docx
         doc = docx.Document(uploaded_file)
         return "\n".join([para.text for para in doc.paragraphs])
     return ""
 
-from datetime import timedelta
+from datetime import timedelta, date
 
 def format_date(date_str):
     try:
@@ -164,6 +73,7 @@ def format_date(date_str):
         return date_str
 
 # --- Database Functions ---
+@st.cache_resource
 def init_db():
     conn = sqlite3.connect('meetings.db')
     c = conn.cursor()
@@ -174,15 +84,18 @@ def init_db():
                   summary TEXT,
                   emails TEXT,
                   timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    actions.init_table(c)
     conn.commit()
     conn.close()
 
-def save_meeting(filename, transcript, summary, emails):
+def save_meeting(filename, transcript, summary, emails, action_items):
     try:
         conn = sqlite3.connect('meetings.db')
         c = conn.cursor()
         c.execute("INSERT INTO meetings (filename, transcript, summary, emails) VALUES (?, ?, ?, ?)",
                   (filename, transcript, summary, json.dumps(emails)))
+        meeting_id = c.lastrowid
+        actions.insert(c, meeting_id, action_items)
         conn.commit()
         conn.close()
     except Exception as e:
@@ -211,7 +124,7 @@ def get_history():
         })
     return history
 
-# Initialize DB on start
+# Initialize DB once per process; cache_resource skips it on reruns
 init_db()
 
 # --- AI Generation Function ---
@@ -220,29 +133,15 @@ def generate_content(transcript, api_key):
         st.error("API Key not found. Please check your .env file.")
         return None
 
+    import google.generativeai as genai
     genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-flash-latest')
-    
-    prompt = f"""
-    You are an expert meeting assistant. Analyze the following meeting transcript and provide:
-    1. A summary of the meeting (100-150 words).
-    2. Three distinct follow-up email drafts:
-       - Option 1: Formal and detailed.
-       - Option 2: Concise and action-oriented.
-       - Option 3: Friendly and casual.
-    
-    Return the output strictly in VALID JSON format with the following structure. Do not include any markdown formatting like ```json ... ```, just the raw JSON string:
-    {{
-        "summary": "...",
-        "emails": ["Email 1 content...", "Email 2 content...", "Email 3 content..."]
-    }}
-    
-    Transcript:
-    {transcript[:10000]} 
-    """
+    prompt = prompts.get_prompt("meeting_summary")
     
     try:
-        response = model.generate_content(prompt)
+        model = prompts.get_model(prompt, api_key)
+        started = time.perf_counter()
+        response = model.generate_content(prompt.render(transcript, date.today()))
+        prompts.record_usage(prompt, response, started)
         content = response.text
         
         # Clean up markdown
@@ -258,6 +157,7 @@ def generate_content(transcript, api_key):
         # Clean the text fields
         data['summary'] = clean_text(data['summary'])
         data['emails'] = [clean_text(email) for email in data['emails']]
+        data['action_items'] = actions.parse(data.get('action_items'))
         
         return data
     except Exception as e:
@@ -415,7 +315,8 @@ elif st.session_state.view == 'home':
                         st.session_state.filename,
                         st.session_state.transcript,
                         result['summary'],
-                        result['emails']
+                        result['emails'],
+                        result['action_items']
                     )
                     st.session_state.step = 'result'
                     st.rerun()
@@ -444,6 +345,19 @@ elif st.session_state.view == 'home':
         
         st.divider()
         
+        # Action Items Section
+        st.subheader("Action Items")
+        if result['action_items']:
+            st.dataframe(
+                [{"Owner": item['owner'] or "-", "Task": item['task'], "Due": item['due_date'] or item['due_phrase'] or "-"} for item in result['action_items']],
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("No action items found in this meeting.")
+        
+        st.divider()
+        
         # Email Section
         st.subheader("Email Drafts")
         tab1, tab2, tab3 = st.tabs(["Formal", "Action-Oriented", "Casual"])
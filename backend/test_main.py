@@ -0,0 +1,396 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import google.generativeai as genai
+import httpx
+import pytest
+from google.generativeai import caching
+
+import actions
+import bench_startup
+import main
+import prompts
+
+# Time to ready with lazy SDK imports, as a fraction of the eager baseline timed in the same run
+STARTUP_BUDGET_RATIO = 0.6
+# Optional extra absolute budget for process start to first /generate
+STARTUP_BUDGET_MS = os.getenv("STARTUP_BUDGET_MS")
+
+MEETING_DATE = date(2026, 10, 19)
+
+TRANSCRIPT = """
+Lisa: We need to switch DNS on Friday.
+Tom: I'll update the payment service config before the DNS switch.
+"""
+
+
+def fake_token_count(text):
+    return len(text) // 4
+
+
+class FakeTokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, cached_content_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.cached_content_token_count = cached_content_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeModel:
+    action_items = [
+        {"owner": "Tom", "task": "Update the payment service config", "due_date": "2026-10-23",
+         "due_phrase": "before the DNS switch",
+         "source_turn": "Tom: I'll update the payment service config before the DNS switch."},
+        {"owner": "Lisa", "task": "Switch **DNS**", "due_date": "Friday", "due_phrase": "on Friday",
+         "source_turn": None},
+        {"owner": "Lisa", "task": ""},
+    ]
+    calls = 0
+    counted = 0
+    # What each request puts on the wire: instructions travel with the request
+    # unless they live in a cached-content handle
+    sent = []
+
+    def __init__(self, model_name, system_instruction=None, cached_content=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.cached_content = cached_content
+
+    @classmethod
+    def from_cached_content(cls, cached_content):
+        return cls(prompts.MODEL_NAME, cached_content=cached_content)
+
+    def count_tokens(self, contents):
+        FakeModel.counted += 1
+        return FakeTokenCount(fake_token_count(contents))
+
+    async def generate_content_async(self, prompt):
+        FakeModel.calls += 1
+        FakeModel.sent.append({
+            "system_instruction": self.system_instruction,
+            "cached_content": self.cached_content,
+            "contents": prompt,
+        })
+        if self.cached_content is not None:
+            cached_tokens = fake_token_count(self.cached_content["system_instruction"])
+        else:
+            cached_tokens = 0
+        instruction_tokens = fake_token_count(self.system_instruction or "") + cached_tokens
+        usage = FakeUsage(instruction_tokens + fake_token_count(prompt), cached_tokens)
+        # Hold the call open long enough for every request to pile up behind it
+        await asyncio.sleep(0.2)
+        return FakeResponse(json.dumps({
+            "summary": "Tom updates the payment config before the DNS switch.",
+            "emails": ["Formal", "Action", "Casual"],
+            "action_items": FakeModel.action_items,
+        }), usage)
+
+
+cache_creates = []
+
+
+def record_cache_create(**kwargs):
+    cache_creates.append(kwargs)
+    return kwargs
+
+
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(genai, "GenerativeModel", FakeModel)
+    monkeypatch.setattr(caching.CachedContent, "create", record_cache_create)
+    monkeypatch.setattr(prompts, "_models", {})
+    monkeypatch.setattr(prompts, "_instruction_tokens", {})
+    monkeypatch.setattr(prompts, "_uncached_latency", {})
+    FakeModel.calls = 0
+    FakeModel.counted = 0
+    FakeModel.sent = []
+    cache_creates.clear()
+    main.init_db()
+    return tmp_path
+
+
+async def post_generate(transcripts):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*[
+            client.post("/generate", json={
+                "transcript": transcript,
+                "filename": f"shared_{i}.txt",
+                "meeting_date": MEETING_DATE.isoformat(),
+            })
+            for i, transcript in enumerate(transcripts)
+        ])
+
+
+def test_identical_generate_requests_share_one_call(app_env):
+    # Whitespace differences between pastes still coalesce
+    transcripts = [TRANSCRIPT] * 49 + ["  " + TRANSCRIPT.strip() + "\n\n"]
+    responses = asyncio.run(post_generate(transcripts))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.text for r in responses}) == 1
+    assert FakeModel.calls == 1
+
+    conn = sqlite3.connect("meetings.db")
+    assert conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0] == 1
+    conn.close()
+
+
+def test_generate_waits_on_lock_held_by_another_worker(app_env, monkeypatch):
+    monkeypatch.setattr(main, "LOCK_POLL_INTERVAL", 0.01)
+    key = main.request_key(TRANSCRIPT, MEETING_DATE)
+    # Another process owns the generation and publishes its meeting
+    assert main.acquire_generation_lock(key)
+    request = main.GenerateRequest(transcript=TRANSCRIPT, filename="other_worker.txt")
+    items = actions.parse([{"owner": "Tom", "task": "Update config"}])
+    main.save_meeting(request, {"summary": "From the other worker", "emails": ["a", "b", "c"]}, items, key)
+
+    (response,) = asyncio.run(post_generate([TRANSCRIPT]))
+
+    assert response.json()["summary"] == "From the other worker"
+    assert response.json()["action_items"][0]["owner"] == "Tom"
+    assert FakeModel.calls == 0
+
+
+def test_generate_waits_for_in_progress_lock_to_publish(app_env, monkeypatch):
+    monkeypatch.setattr(main, "LOCK_POLL_INTERVAL", 0.01)
+    key = main.request_key(TRANSCRIPT, MEETING_DATE)
+    assert main.acquire_generation_lock(key)
+
+    async def other_worker_publishes():
+        await asyncio.sleep(0.1)
+        request = main.GenerateRequest(transcript=TRANSCRIPT, filename="other_worker.txt")
+        main.save_meeting(request, {"summary": "Published later", "emails": ["a", "b", "c"]}, [], key)
+
+    async def scenario():
+        responses, _ = await asyncio.gather(post_generate([TRANSCRIPT]), other_worker_publishes())
+        return responses
+
+    (response,) = asyncio.run(scenario())
+
+    assert response.json()["summary"] == "Published later"
+    assert FakeModel.calls == 0
+
+
+def test_generate_takes_over_when_owner_releases_without_result(app_env, monkeypatch):
+    monkeypatch.setattr(main, "LOCK_POLL_INTERVAL", 0.01)
+    key = main.request_key(TRANSCRIPT, MEETING_DATE)
+    assert main.acquire_generation_lock(key)
+
+    async def other_worker_gives_up():
+        await asyncio.sleep(0.1)
+        main.release_generation_lock(key)
+
+    async def scenario():
+        responses, _ = await asyncio.gather(post_generate([TRANSCRIPT]), other_worker_gives_up())
+        return responses
+
+    (response,) = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert FakeModel.calls == 1
+
+    conn = sqlite3.connect("meetings.db")
+    assert conn.execute("SELECT filename FROM meetings").fetchall() == [("shared_0.txt",)]
+    conn.close()
+
+
+def test_finished_locks_are_cleaned_up_for_every_key(app_env, monkeypatch):
+    monkeypatch.setattr(main, "LOCK_GRACE", 0)
+    for i in range(3):
+        asyncio.run(post_generate([f"{TRANSCRIPT}\nLisa: Meeting {i}."]))
+
+    conn = sqlite3.connect("meetings.db")
+    # Each acquire clears the earlier meetings' finished locks; only the last remains
+    assert conn.execute("SELECT COUNT(*) FROM generation_locks").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0] == 3
+    conn.close()
+
+
+def test_action_items_are_stored_and_filtered(app_env):
+    (response,) = asyncio.run(post_generate([TRANSCRIPT]))
+    items = response.json()["action_items"]
+    assert [item["task"] for item in items] == ["Update the payment service config", "Switch DNS"]
+    # Non-ISO due dates cannot be compared, so only the spoken deadline is kept
+    assert items[1]["due_date"] is None
+    assert items[1]["due_phrase"] == "on Friday"
+    # Relative deadlines are resolved against the meeting date sent with the transcript
+    assert FakeModel.sent[0]["contents"].startswith("Meeting date: 2026-10-19\n")
+
+    async def get(params):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/action-items", params=params)).json()
+
+    assert len(asyncio.run(get({}))) == 2
+    assert [item["task"] for item in asyncio.run(get({"owner": "lisa"}))] == ["Switch DNS"]
+    assert [item["owner"] for item in asyncio.run(get({"due_before": "2026-11-01"}))] == ["Tom"]
+    assert asyncio.run(get({"owner": "Tom", "due_before": "2026-10-23"})) == []
+
+
+def test_action_items_with_unexpected_types_are_coerced(app_env, monkeypatch):
+    monkeypatch.setattr(FakeModel, "action_items", [
+        {"owner": ["Lisa", "Tom"], "task": "Plan the DNS switch", "due_date": 5, "source_turn": 7},
+        {"owner": "Tom", "task": ["not", "a", "task"]},
+        {"owner": "Tom", "task": None},
+    ])
+
+    (response,) = asyncio.run(post_generate([TRANSCRIPT]))
+
+    assert "DEMO MODE" not in response.json()["summary"]
+    assert response.json()["action_items"] == [{
+        "owner": "Lisa, Tom",
+        "task": "Plan the DNS switch",
+        "due_date": None,
+        "due_phrase": None,
+        "source_turn": "7",
+    }]
+    conn = sqlite3.connect("meetings.db")
+    assert conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0] == 1
+    assert conn.execute("SELECT owner FROM action_items").fetchall() == [("Lisa, Tom",)]
+    conn.close()
+
+
+def test_action_item_filters_use_indexes(app_env):
+    conn = sqlite3.connect("meetings.db")
+    for query, params in [
+        ("SELECT * FROM action_items WHERE owner = ? COLLATE NOCASE AND due_date < ?", ("Tom", "2026-11-01")),
+        ("SELECT * FROM action_items WHERE due_date < ?", ("2026-11-01",)),
+    ]:
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+        assert "USING INDEX" in plan
+    conn.close()
+
+
+def test_small_instructions_skip_context_cache(app_env, capsys):
+    transcripts = [TRANSCRIPT, TRANSCRIPT + "\nTom: One more thing."]
+    for transcript in transcripts:
+        asyncio.run(post_generate([transcript]))
+
+    prompt = prompts.get_prompt("meeting_summary")
+    assert fake_token_count(prompt.system_instruction) < prompts.MIN_CACHE_TOKENS
+    # Too small to cache: no token count or create call, instructions re-sent with every request
+    assert cache_creates == []
+    assert FakeModel.counted == 0
+    assert FakeModel.sent == [{
+        "system_instruction": prompt.system_instruction,
+        "cached_content": None,
+        "contents": prompt.render(transcript, MEETING_DATE),
+    } for transcript in transcripts]
+    metrics = [line for line in capsys.readouterr().out.splitlines() if line.startswith("METRICS: ")]
+    assert len(metrics) == 2
+    assert all("input_tokens_saved=0 input_token_reduction_pct=0.0" in line for line in metrics)
+    # The first uncached call becomes the latency baseline for the next one
+    assert "uncached_latency_ms=None latency_delta_ms=None" in metrics[0]
+    assert "uncached_latency_ms=None" not in metrics[1]
+
+
+def test_large_instructions_go_through_cached_content(app_env, monkeypatch, capsys):
+    monkeypatch.setattr(prompts, "MIN_CACHE_TOKENS", 1)
+    asyncio.run(post_generate([TRANSCRIPT]))
+    asyncio.run(post_generate([TRANSCRIPT + "\nTom: One more thing."]))
+
+    prompt = prompts.get_prompt("meeting_summary")
+    assert len(cache_creates) == 1
+    assert cache_creates[0]["system_instruction"] == prompt.system_instruction
+    # Only the rendered template travels with each request
+    for sent in FakeModel.sent:
+        assert sent["system_instruction"] is None
+        assert sent["cached_content"] is cache_creates[0]
+        assert sent["contents"].startswith("Meeting date: ")
+    instruction_tokens = fake_token_count(prompt.system_instruction)
+    assert f"input_tokens_saved={instruction_tokens} " in capsys.readouterr().out
+
+
+def test_concurrent_misses_create_one_cache(app_env, monkeypatch):
+    def slow_create(**kwargs):
+        time.sleep(0.1)
+        return record_cache_create(**kwargs)
+
+    monkeypatch.setattr(prompts, "MIN_CACHE_TOKENS", 1)
+    monkeypatch.setattr(caching.CachedContent, "create", slow_create)
+    prompt = prompts.get_prompt("meeting_summary")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: prompts.get_model(prompt, "test-key"), range(8)))
+
+    assert len(cache_creates) == 1
+    assert FakeModel.counted == 1
+    assert all(model is models[0] for model in models)
+
+
+def test_falls_back_to_system_instruction_when_caching_is_rejected(app_env, monkeypatch):
+    def reject(**kwargs):
+        raise ValueError("Cached content is too small")
+
+    monkeypatch.setattr(prompts, "MIN_CACHE_TOKENS", 1)
+    monkeypatch.setattr(caching.CachedContent, "create", reject)
+    prompt = prompts.get_prompt("meeting_summary")
+
+    model = prompts.get_model(prompt, "test-key")
+
+    assert model.cached_content is None
+    assert model.system_instruction == prompt.system_instruction
+    assert prompts.get_model(prompt, "test-key") is model
+
+
+def test_entry_point_does_not_import_heavy_sdks():
+    times = bench_startup.import_times("main")
+
+    assert [name for name in bench_startup.HEAVY_MODULES if name in times] == []
+
+
+def test_lifespan_initializes_db_and_warms_sdks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    imported = []
+
+    def fake_import(name):
+        imported.append(name)
+
+    monkeypatch.setattr(main.importlib, "import_module", fake_import)
+
+    async def start_and_stop():
+        async with main.lifespan(main.app):
+            pass
+
+    asyncio.run(start_and_stop())
+
+    assert sorted(imported) == sorted(main.LAZY_MODULES)
+    conn = sqlite3.connect("meetings.db")
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert {"meetings", "generation_locks", "action_items"} <= tables
+
+
+def test_ready_within_startup_budget_of_eager_baseline():
+    # Interleaved best-of-2 so a load spike hits both sides alike
+    lazy, eager = [], []
+    for _ in range(2):
+        lazy.append(bench_startup.first_request_times()["ready"])
+        eager.append(bench_startup.first_request_times(eager=True)["ready"])
+
+    assert min(lazy) <= STARTUP_BUDGET_RATIO * min(eager)
+
+
+@pytest.mark.skipif(not STARTUP_BUDGET_MS, reason="set STARTUP_BUDGET_MS to enforce a startup budget")
+def test_first_generate_within_startup_budget():
+    times = bench_startup.first_request_times()
+
+    assert times["first_generate"] < int(STARTUP_BUDGET_MS)